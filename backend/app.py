@@ -1,10 +1,21 @@
 import os
 import boto3
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response
 from flask_cors import CORS
 from botocore.exceptions import ClientError, NoCredentialsError
 import logging
 import json
+import gzip
+import math
+import threading
+
+from clip_catalog import ClipCatalog, DEFAULT_CATALOG_PATH
+from concept_search import ConceptSearch, DEFAULT_INDEX_DIR
+
+try:
+    import brotli
+except ImportError:  # brotli is optional - fall back to gzip only
+    brotli = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,18 +30,52 @@ CORS(app)
 BUCKET_NAME = "sunhacks25"
 FOLDER_NAME = "vids"
 
+# Multipart upload configuration (S3 limits: 5 MiB minimum part, 10,000 parts)
+MIN_PART_SIZE = 8 * 1024 * 1024
+MAX_PART_SIZE = 5 * 1024 * 1024 * 1024
+TARGET_PART_COUNT = 500
+MAX_PART_COUNT = 10000
+MAX_OBJECT_SIZE = 5 * 1024 * 1024 * 1024 * 1024  # S3 object limit: 5 TiB
+PRESIGN_EXPIRES_IN = 3600
+# S3 errors caused by the client's upload state rather than the server
+MULTIPART_CLIENT_ERRORS = ('InvalidPart', 'InvalidPartOrder', 'EntityTooSmall', 'NoSuchUpload')
+
+# Clip catalog written by studyslice_ai.py; opened read-only, the pipeline owns the schema
+CATALOG_PATH = os.getenv('CLIP_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+clip_catalog = ClipCatalog(CATALOG_PATH, readonly=True)
+
+# Concept search index written by studyslice_ai.py; kept memory-mapped between requests
+concept_search = ConceptSearch(os.getenv('SEARCH_INDEX_DIR', DEFAULT_INDEX_DIR))
+
+# In-process cache of clip manifests, keyed by video name.
+# Each entry holds the S3 ETag plus the serialized (and lazily compressed) body.
+clips_cache = {}
+clips_cache_lock = threading.Lock()
+
+# Shared S3 client - boto3 clients are thread-safe and costly to build per request
+shared_s3_client = None
+s3_client_lock = threading.Lock()
+
 def get_s3_client():
-    """Initialize and return S3 client using EC2 IAM role"""
-    try:
-        # boto3 will automatically use the EC2 instance's IAM role
-        s3_client = boto3.client(
-            's3',
-            region_name=os.getenv('AWS_REGION', 'us-east-1')
-        )
-        return s3_client
-    except NoCredentialsError:
-        logger.error("AWS credentials not found - ensure EC2 instance has proper IAM role")
-        return None
+    """Initialize (once) and return the S3 client using EC2 IAM role"""
+    global shared_s3_client
+    if shared_s3_client is not None:
+        return shared_s3_client
+    
+    with s3_client_lock:
+        if shared_s3_client is None:
+            try:
+                # boto3 will automatically use the EC2 instance's IAM role
+                # S3_ENDPOINT_URL points at a local S3 stand-in (MinIO, moto) for testing
+                shared_s3_client = boto3.client(
+                    's3',
+                    region_name=os.getenv('AWS_REGION', 'us-east-1'),
+                    endpoint_url=os.getenv('S3_ENDPOINT_URL') or None
+                )
+            except NoCredentialsError:
+                logger.error("AWS credentials not found - ensure EC2 instance has proper IAM role")
+                return None
+        return shared_s3_client
 
 @app.route('/upload', methods=['POST'])
 def create_presigned_url():
@@ -95,6 +140,269 @@ def create_presigned_url():
             'details': str(e)
         }), 500
 
+def calculate_part_size(file_size):
+    """
+    Scale the multipart part size with the file size so large uploads stay
+    around TARGET_PART_COUNT parts, rounded up to a whole MiB.
+    """
+    mib = 1024 * 1024
+    part_size = max(MIN_PART_SIZE, math.ceil(file_size / TARGET_PART_COUNT))
+    part_size = math.ceil(part_size / mib) * mib
+    return min(part_size, MAX_PART_SIZE)
+
+
+@app.route('/upload/multipart/initiate', methods=['POST'])
+def initiate_multipart_upload():
+    """
+    Start a multipart upload to S3
+    Expects JSON payload with 'filename' and 'file_size' (bytes) fields
+    """
+    try:
+        data = request.get_json()
+        if not data or 'filename' not in data or 'file_size' not in data:
+            return jsonify({
+                'error': 'Missing filename or file_size in request body'
+            }), 400
+        
+        filename = data['filename']
+        if not filename:
+            return jsonify({
+                'error': 'Filename cannot be empty'
+            }), 400
+        
+        try:
+            file_size = int(data['file_size'])
+        except (TypeError, ValueError):
+            return jsonify({
+                'error': 'file_size must be an integer number of bytes'
+            }), 400
+        if file_size <= 0:
+            return jsonify({
+                'error': 'file_size must be positive'
+            }), 400
+        if file_size > MAX_OBJECT_SIZE:
+            return jsonify({
+                'error': 'file_size exceeds the 5 TiB S3 object limit'
+            }), 400
+        
+        part_size = calculate_part_size(file_size)
+        part_count = math.ceil(file_size / part_size)
+        if part_count > MAX_PART_COUNT:
+            return jsonify({
+                'error': 'File too large for multipart upload'
+            }), 400
+        
+        s3_client = get_s3_client()
+        if not s3_client:
+            return jsonify({
+                'error': 'AWS IAM role not configured properly on EC2 instance'
+            }), 500
+        
+        s3_key = f"{FOLDER_NAME}/{filename}"
+        
+        try:
+            response = s3_client.create_multipart_upload(
+                Bucket=BUCKET_NAME,
+                Key=s3_key,
+                ContentType='application/octet-stream'
+            )
+            
+            return jsonify({
+                'upload_id': response['UploadId'],
+                'bucket': BUCKET_NAME,
+                'key': s3_key,
+                'part_size': part_size,
+                'part_count': part_count
+            }), 200
+            
+        except ClientError as e:
+            logger.error(f"Error initiating multipart upload: {e}")
+            return jsonify({
+                'error': 'Failed to initiate multipart upload',
+                'details': str(e)
+            }), 500
+            
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+
+@app.route('/upload/multipart/presign', methods=['POST'])
+def presign_multipart_parts():
+    """
+    Create presigned URLs for several parts of a multipart upload
+    Expects JSON payload with 'key', 'upload_id' and 'part_numbers' fields
+    """
+    try:
+        data = request.get_json()
+        if not data or not all(field in data for field in ('key', 'upload_id', 'part_numbers')):
+            return jsonify({
+                'error': 'Missing key, upload_id or part_numbers in request body'
+            }), 400
+        
+        part_numbers = data['part_numbers']
+        if (not isinstance(part_numbers, list) or not part_numbers
+                or not all(isinstance(n, int) and 1 <= n <= MAX_PART_COUNT for n in part_numbers)):
+            return jsonify({
+                'error': f'part_numbers must be a non-empty list of integers between 1 and {MAX_PART_COUNT}'
+            }), 400
+        
+        s3_client = get_s3_client()
+        if not s3_client:
+            return jsonify({
+                'error': 'AWS IAM role not configured properly on EC2 instance'
+            }), 500
+        
+        try:
+            # Presigning is a local signing operation, no S3 round-trip per part
+            urls = {
+                str(part_number): s3_client.generate_presigned_url(
+                    'upload_part',
+                    Params={
+                        'Bucket': BUCKET_NAME,
+                        'Key': data['key'],
+                        'UploadId': data['upload_id'],
+                        'PartNumber': part_number
+                    },
+                    ExpiresIn=PRESIGN_EXPIRES_IN
+                )
+                for part_number in part_numbers
+            }
+            
+            return jsonify({
+                'upload_id': data['upload_id'],
+                'key': data['key'],
+                'urls': urls,
+                'expires_in': PRESIGN_EXPIRES_IN
+            }), 200
+            
+        except ClientError as e:
+            logger.error(f"Error presigning upload parts: {e}")
+            return jsonify({
+                'error': 'Failed to generate presigned part URLs',
+                'details': str(e)
+            }), 500
+            
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+
+@app.route('/upload/multipart/complete', methods=['POST'])
+def complete_multipart_upload():
+    """
+    Complete a multipart upload
+    Expects JSON payload with 'key', 'upload_id' and 'parts' ([{part_number, etag}])
+    """
+    try:
+        data = request.get_json()
+        if not data or not all(field in data for field in ('key', 'upload_id', 'parts')):
+            return jsonify({
+                'error': 'Missing key, upload_id or parts in request body'
+            }), 400
+        
+        try:
+            parts = sorted(
+                ({'PartNumber': int(part['part_number']), 'ETag': part['etag']} for part in data['parts']),
+                key=lambda part: part['PartNumber']
+            )
+        except (KeyError, TypeError, ValueError):
+            return jsonify({
+                'error': 'Each part must have part_number and etag'
+            }), 400
+        if not parts:
+            return jsonify({
+                'error': 'parts cannot be empty'
+            }), 400
+        
+        s3_client = get_s3_client()
+        if not s3_client:
+            return jsonify({
+                'error': 'AWS IAM role not configured properly on EC2 instance'
+            }), 500
+        
+        try:
+            response = s3_client.complete_multipart_upload(
+                Bucket=BUCKET_NAME,
+                Key=data['key'],
+                UploadId=data['upload_id'],
+                MultipartUpload={'Parts': parts}
+            )
+            
+            return jsonify({
+                'bucket': BUCKET_NAME,
+                'key': data['key'],
+                'etag': response.get('ETag'),
+                'location': response.get('Location')
+            }), 200
+            
+        except ClientError as e:
+            logger.error(f"Error completing multipart upload: {e}")
+            return jsonify({
+                'error': 'Failed to complete multipart upload',
+                'details': str(e)
+            }), 400 if e.response['Error']['Code'] in MULTIPART_CLIENT_ERRORS else 500
+            
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+
+@app.route('/upload/multipart/abort', methods=['POST'])
+def abort_multipart_upload():
+    """
+    Abort a multipart upload and discard its uploaded parts
+    Expects JSON payload with 'key' and 'upload_id' fields
+    """
+    try:
+        data = request.get_json()
+        if not data or 'key' not in data or 'upload_id' not in data:
+            return jsonify({
+                'error': 'Missing key or upload_id in request body'
+            }), 400
+        
+        s3_client = get_s3_client()
+        if not s3_client:
+            return jsonify({
+                'error': 'AWS IAM role not configured properly on EC2 instance'
+            }), 500
+        
+        try:
+            s3_client.abort_multipart_upload(
+                Bucket=BUCKET_NAME,
+                Key=data['key'],
+                UploadId=data['upload_id']
+            )
+            
+            return jsonify({
+                'aborted': True,
+                'key': data['key'],
+                'upload_id': data['upload_id']
+            }), 200
+            
+        except ClientError as e:
+            logger.error(f"Error aborting multipart upload: {e}")
+            return jsonify({
+                'error': 'Failed to abort multipart upload',
+                'details': str(e)
+            }), 400 if e.response['Error']['Code'] in MULTIPART_CLIENT_ERRORS else 500
+            
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -143,32 +451,221 @@ def process_transcript():
         return jsonify({'error': str(e)}), 500
     
 
+def fetch_clips_manifest(s3_client, video_name):
+    """
+    Return the cached clip manifest for a video, revalidating it against S3.
+    Unchanged manifests are not re-downloaded: the cached ETag is sent as
+    IfNoneMatch and a 304 from S3 keeps the cached entry.
+    """
+    clips_key = f"clips/{video_name}-clips.json"
+
+    with clips_cache_lock:
+        cached = clips_cache.get(video_name)
+
+    params = {'Bucket': BUCKET_NAME, 'Key': clips_key}
+    if cached:
+        params['IfNoneMatch'] = cached['etag']
+
+    try:
+        response = s3_client.get_object(**params)
+    except ClientError as e:
+        if cached and e.response['Error']['Code'] in ('304', 'NotModified'):
+            return cached
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            with clips_cache_lock:
+                clips_cache.pop(video_name, None)
+        raise
+
+    clips_content = response['Body'].read().decode('utf-8')
+    # Round-trip through json to validate and normalize the manifest once
+    body = json.dumps(json.loads(clips_content)).encode('utf-8')
+
+    entry = {
+        'etag': response['ETag'],
+        'body': body,
+        'encoded': {}
+    }
+    with clips_cache_lock:
+        clips_cache[video_name] = entry
+    return entry
+
+
+def parse_accept_encoding(accept_encoding):
+    """Parse Accept-Encoding into {coding: q-value}."""
+    qualities = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    return qualities
+
+
+def choose_clips_encoding(accept_encoding):
+    """Pick 'br', 'gzip' or None (identity) honouring q-values, including q=0."""
+    qualities = parse_accept_encoding(accept_encoding)
+    wildcard = qualities.get('*', 0.0)
+
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and not brotli:
+            continue
+        if qualities.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def variant_etag(etag, encoding):
+    """Give each encoded variant its own strong ETag, e.g. "<s3-etag>-gzip"."""
+    if not encoding:
+        return etag
+    return f'"{etag.strip(chr(34))}-{encoding}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag (W/ tags match)."""
+    if if_none_match.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+def encode_clips_body(entry, encoding):
+    """Return the manifest body for an encoding, compressing it once per cache entry."""
+    if not encoding:
+        return entry['body']
+
+    encoded = entry['encoded'].get(encoding)
+    if encoded is None:
+        if encoding == 'br':
+            encoded = brotli.compress(entry['body'])
+        else:
+            encoded = gzip.compress(entry['body'])
+        entry['encoded'][encoding] = encoded
+    return encoded
+
+
 @app.route('/get-clips/<video_name>', methods=['GET'])
 def get_clips(video_name):
     """
     Get processed clips for a video
+    Supports If-None-Match (304) and gzip/br response compression
     """
     try:
         s3_client = get_s3_client()
-        clips_key = f"clips/{video_name}-clips.json"
         
         try:
-            response = s3_client.get_object(Bucket=BUCKET_NAME, Key=clips_key)
-            clips_content = response['Body'].read().decode('utf-8')
-            clips_json = json.loads(clips_content)
-            
-            return jsonify(clips_json), 200
-            
+            entry = fetch_clips_manifest(s3_client, video_name)
         except ClientError as e:
             if e.response['Error']['Code'] == 'NoSuchKey':
                 return jsonify({'error': 'Clips not found - may still be processing'}), 404
             else:
                 raise e
+
+        encoding = choose_clips_encoding(request.headers.get('Accept-Encoding', ''))
+        etag = variant_etag(entry['etag'], encoding)
+        if etag_matches(request.headers.get('If-None-Match', ''), etag):
+            response = make_response('', 304)
+        else:
+            body = encode_clips_body(entry, encoding)
+            response = make_response(body, 200)
+            response.headers['Content-Type'] = 'application/json'
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
                 
     except Exception as e:
         logger.error(f"Error getting clips: {e}")
         return jsonify({'error': str(e)}), 500
 
+def parse_number_arg(name, cast, default=None, minimum=None, maximum=None):
+    """
+    Parse a numeric query parameter, raising ValueError on malformed input.
+    Values are clamped to [minimum, maximum].
+    """
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return default
+    value = cast(raw)
+    if cast is float and not math.isfinite(value):
+        raise ValueError(f"{name} must be finite")
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+@app.route('/clips/search', methods=['GET'])
+def search_clips():
+    """
+    Query the clip catalog across all processed lectures
+    Optional query params: subject, concept_type, min_confidence, lecture, limit
+    """
+    try:
+        try:
+            min_confidence = parse_number_arg('min_confidence', float)
+            limit = parse_number_arg('limit', int, default=100, minimum=1, maximum=1000)
+        except ValueError:
+            return jsonify({'error': 'Invalid min_confidence or limit'}), 400
+        
+        clips = clip_catalog.query(
+            subject=request.args.get('subject'),
+            concept_type=request.args.get('concept_type'),
+            min_confidence=min_confidence,
+            lecture_id=request.args.get('lecture'),
+            limit=limit
+        )
+        
+        return jsonify({
+            'count': len(clips),
+            'clips': clips
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error searching clips: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/search', methods=['GET'])
+def search_concepts():
+    """
+    Full-text concept search over transcripts and clips
+    Query params: q (required), lecture, limit
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Missing q query parameter'}), 400
+        
+        try:
+            limit = parse_number_arg('limit', int, default=20, minimum=1, maximum=100)
+        except ValueError:
+            return jsonify({'error': 'Invalid limit'}), 400
+        
+        results = concept_search.search(query, limit=limit, lecture_id=request.args.get('lecture'))
+        
+        return jsonify({
+            'query': query,
+            'timestamps': results['timestamps'],
+            'clips': results['clips']
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error searching concepts: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/video-status/<video_name>', methods=['GET'])
 def get_video_status(video_name):
     """
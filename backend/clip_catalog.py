@@ -0,0 +1,251 @@
+"""
+StudySlice AI - Clip Catalog
+============================
+
+Embedded SQLite index of clips across all processed lectures, so queries like
+"all Definition clips in Biology with confidence >= 0.8" don't have to open
+every studyslice_<subject>_<timestamp>.json file.
+
+Used by studyslice_ai.py (upserts after each run, CLI queries) and app.py
+(/clips/search endpoint).
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_CATALOG_PATH = "studyslice_catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lectures (
+    lecture_id TEXT PRIMARY KEY,
+    title TEXT,
+    subject TEXT,
+    clips_json TEXT,
+    total_clips INTEGER,
+    processing_date TEXT
+);
+
+CREATE TABLE IF NOT EXISTS clips (
+    lecture_id TEXT NOT NULL REFERENCES lectures(lecture_id) ON DELETE CASCADE,
+    clip_id TEXT NOT NULL,
+    subject TEXT,
+    concept_type TEXT,
+    title TEXT,
+    description TEXT,
+    start_time REAL,
+    end_time REAL,
+    duration REAL,
+    confidence REAL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (lecture_id, clip_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_clips_subject ON clips(subject);
+CREATE INDEX IF NOT EXISTS idx_clips_concept_type ON clips(concept_type);
+CREATE INDEX IF NOT EXISTS idx_clips_confidence ON clips(confidence);
+CREATE INDEX IF NOT EXISTS idx_clips_lecture ON clips(lecture_id);
+CREATE INDEX IF NOT EXISTS idx_clips_subject_type_confidence
+    ON clips(subject, concept_type, confidence);
+"""
+
+
+class ClipCatalog:
+    """
+    Indexed store of clips keyed by (lecture_id, clip_id).
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CATALOG_PATH, readonly: bool = False):
+        """
+        Open (and create if needed) the catalog database.
+
+        Args:
+            db_path: Path to the SQLite database file
+            readonly: Open for queries only; skips schema setup so readers
+                never take a write transaction (used by the Flask app)
+        """
+        self.db_path = db_path
+        self.readonly = readonly
+
+        if not readonly:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a committing connection; one per call keeps the catalog safe
+        across Flask threads.
+        """
+        if self.readonly:
+            conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert_lecture(self,
+                       lecture_id: str,
+                       lecture_info: Dict,
+                       clips: List[Dict],
+                       clips_json_path: Optional[str] = None) -> int:
+        """
+        Insert or replace a lecture and all of its clips.
+
+        Args:
+            lecture_id: Stable lecture identifier (e.g. transcript name)
+            lecture_info: The clips JSON 'lecture_info' block
+            clips: The clips JSON 'clips' list
+            clips_json_path: Path of the JSON file the clips came from
+
+        Returns:
+            Number of clips indexed
+        """
+        subject = lecture_info.get('subject')
+        rows = [
+            (
+                lecture_id,
+                clip['clip_id'],
+                subject,
+                clip.get('concept_type'),
+                clip.get('title'),
+                clip.get('description'),
+                clip.get('start_time'),
+                clip.get('end_time'),
+                clip.get('duration'),
+                clip.get('confidence'),
+                json.dumps(clip, ensure_ascii=False)
+            )
+            for clip in clips
+        ]
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO lectures (lecture_id, title, subject, clips_json, total_clips, processing_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(lecture_id) DO UPDATE SET
+                    title = excluded.title,
+                    subject = excluded.subject,
+                    clips_json = excluded.clips_json,
+                    total_clips = excluded.total_clips,
+                    processing_date = excluded.processing_date
+                """,
+                (
+                    lecture_id,
+                    lecture_info.get('title'),
+                    subject,
+                    clips_json_path,
+                    len(clips),
+                    lecture_info.get('processing_date', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+            )
+            # Re-processing a lecture replaces its clip set
+            conn.execute("DELETE FROM clips WHERE lecture_id = ?", (lecture_id,))
+            conn.executemany(
+                """
+                INSERT INTO clips (lecture_id, clip_id, subject, concept_type, title, description,
+                                   start_time, end_time, duration, confidence, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+
+        return len(rows)
+
+    def import_clips_json(self, clips_json_path: str, lecture_id: Optional[str] = None) -> int:
+        """
+        Index an existing studyslice clips JSON file.
+
+        Args:
+            clips_json_path: Path to clips JSON file
+            lecture_id: Lecture identifier (defaults to lecture_info.lecture_id,
+                then the file stem)
+
+        Returns:
+            Number of clips indexed
+        """
+        with open(clips_json_path, 'r', encoding='utf-8') as f:
+            clips_data = json.load(f)
+
+        lecture_info = clips_data.get('lecture_info', {})
+        return self.upsert_lecture(
+            lecture_id or lecture_info.get('lecture_id') or Path(clips_json_path).stem,
+            lecture_info,
+            clips_data.get('clips', []),
+            clips_json_path
+        )
+
+    def query(self,
+              subject: Optional[str] = None,
+              concept_type: Optional[str] = None,
+              min_confidence: Optional[float] = None,
+              lecture_id: Optional[str] = None,
+              limit: int = 100) -> List[Dict]:
+        """
+        Find clips matching all given filters, best confidence first.
+
+        Args:
+            subject: Academic subject (e.g. 'Biology')
+            concept_type: Concept type (e.g. 'Definition')
+            min_confidence: Minimum clip confidence (0-1)
+            lecture_id: Restrict to a single lecture
+            limit: Maximum number of clips returned
+
+        Returns:
+            List of clip dicts with 'lecture_id' and 'subject' added
+        """
+        conditions = []
+        params = []
+
+        if subject:
+            conditions.append("subject = ?")
+            params.append(subject)
+        if concept_type:
+            conditions.append("concept_type = ?")
+            params.append(concept_type)
+        if min_confidence is not None:
+            conditions.append("confidence >= ?")
+            params.append(min_confidence)
+        if lecture_id:
+            conditions.append("lecture_id = ?")
+            params.append(lecture_id)
+
+        # Nothing processed yet - a read-only catalog can't create the file
+        if self.readonly and not Path(self.db_path).exists():
+            return []
+
+        sql = "SELECT lecture_id, subject, data FROM clips"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY confidence DESC, lecture_id, start_time LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        return [
+            {**json.loads(row['data']), 'lecture_id': row['lecture_id'], 'subject': row['subject']}
+            for row in rows
+        ]
+
+    def list_lectures(self) -> List[Dict]:
+        """Return all indexed lectures."""
+        if self.readonly and not Path(self.db_path).exists():
+            return []
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM lectures ORDER BY processing_date DESC"
+            ).fetchall()
+
+        return [dict(row) for row in rows]
@@ -0,0 +1,565 @@
+"""
+StudySlice AI - Concept Search
+==============================
+
+Local BM25 full-text search over transcript segments and clip titles/descriptions.
+
+Each processed lecture gets its own inverted index file, and the lecture files
+are merged (without re-tokenizing) into one global index. A new lecture is
+appended to the existing global index; only re-processing a lecture that is
+already in it triggers a full rebuild from the lecture files. Index files use
+a compact binary layout and are memory-mapped at query time, so a search only
+touches the term dictionary, the postings of the query terms, the per-doc
+length/kind/lecture columns of scored documents and the JSON metadata of the
+final hits.
+
+File layout (little-endian):
+    header       MAGIC, version, n_docs, n_terms, avg_doc_len, section offsets
+    doc_lens     n_docs x uint32
+    doc_kinds    n_docs x uint32 (index into KINDS)
+    doc_lectures n_docs x uint32 (index into the lectures list)
+    terms        n_terms x (string offset u32, string length u32, df u32, postings offset u64),
+                 sorted by term
+    strings      concatenated UTF-8 terms
+    postings     per term, df x (doc id u32, term frequency u32)
+    doc_offsets  (n_docs + 1) x uint64 offsets into doc_data
+    doc_data     concatenated per-document JSON metadata
+    lectures     JSON array of lecture ids
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_INDEX_DIR = "search_index"
+GLOBAL_INDEX_NAME = "_global.idx"
+
+MAGIC = b'SSBM'
+VERSION = 3
+HEADER = struct.Struct('<4sIIId9Q')
+TERM_ENTRY = struct.Struct('<IIIQ')
+POSTING = struct.Struct('<II')
+DOC_OFFSET = struct.Struct('<Q')
+KINDS = ('segment', 'clip')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he in is it its of on or
+so that the this to was we were will with you i uh um okay
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics and drop stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _u32_bytes(values) -> bytes:
+    return array('I', values).tobytes()
+
+
+def _write_sections(path: str,
+                    avg_doc_len: float,
+                    doc_lens: bytes,
+                    doc_kinds: bytes,
+                    doc_lectures: bytes,
+                    terms,
+                    doc_offsets: bytes,
+                    doc_data: bytes,
+                    lecture_ids: List[str]):
+    """
+    Write already-encoded index sections to disk.
+
+    Args:
+        path: Output file path
+        avg_doc_len: Average document length in tokens
+        doc_lens, doc_kinds, doc_lectures: uint32 column bytes
+        terms: Iterable of (term bytes, df, postings bytes), sorted by term
+        doc_offsets: (n_docs + 1) uint64 offsets into doc_data
+        doc_data: Concatenated per-document JSON
+        lecture_ids: Lecture ids referenced by doc_lectures
+    """
+    term_table = bytearray()
+    strings = bytearray()
+    postings = bytearray()
+    for term, df, term_postings in terms:
+        term_table += TERM_ENTRY.pack(len(strings), len(term), df, len(postings))
+        strings += term
+        postings += term_postings
+
+    lectures_bytes = json.dumps(lecture_ids, ensure_ascii=False).encode('utf-8')
+    sections = [doc_lens, doc_kinds, doc_lectures, term_table, strings, postings,
+                doc_offsets, doc_data, lectures_bytes]
+
+    offsets = []
+    offset = HEADER.size
+    for section in sections:
+        offsets.append(offset)
+        offset += len(section)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(doc_lens) // 4, len(term_table) // TERM_ENTRY.size,
+                            avg_doc_len, *offsets))
+        for section in sections:
+            f.write(section)
+    # Atomic swap so readers never see a half-written index
+    os.replace(tmp_path, path)
+
+
+def write_index(path: str, docs: List[Dict], postings: Dict[str, List[tuple]], doc_lens: List[int]):
+    """
+    Write an inverted index to disk in the binary layout described above.
+
+    Args:
+        path: Output file path
+        docs: Document metadata, indexed by doc id
+        postings: term -> list of (doc_id, tf) sorted by doc_id
+        doc_lens: Token count per doc id
+    """
+    lecture_ids = sorted({doc['lecture_id'] for doc in docs})
+    lecture_ordinals = {lecture_id: i for i, lecture_id in enumerate(lecture_ids)}
+
+    doc_offsets = [0]
+    doc_data = bytearray()
+    for doc in docs:
+        doc_data += json.dumps(doc, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        doc_offsets.append(len(doc_data))
+
+    terms = (
+        (term.encode('utf-8'), len(postings[term]),
+         b''.join(POSTING.pack(doc_id, tf) for doc_id, tf in postings[term]))
+        for term in sorted(postings)
+    )
+
+    _write_sections(
+        path,
+        sum(doc_lens) / len(doc_lens) if doc_lens else 0.0,
+        _u32_bytes(doc_lens),
+        _u32_bytes(KINDS.index(doc['kind']) for doc in docs),
+        _u32_bytes(lecture_ordinals[doc['lecture_id']] for doc in docs),
+        terms,
+        array('Q', doc_offsets).tobytes(),
+        bytes(doc_data),
+        lecture_ids
+    )
+
+
+def combine_indexes(path: str, indexes: List['SearchIndex']):
+    """
+    Concatenate indexes with disjoint lectures into one index file.
+
+    Sections are copied as raw bytes; only postings, lecture ordinals and doc
+    offsets of later indexes are shifted.
+
+    Args:
+        path: Output file path
+        indexes: Indexes to combine, in doc id order
+    """
+    lecture_ids = []
+    doc_lens, doc_kinds, doc_lectures = bytearray(), bytearray(), bytearray()
+    doc_offsets, doc_data = array('Q', [0]), bytearray()
+    term_sources = []
+    total_tokens = 0.0
+    doc_base = 0
+
+    for index in indexes:
+        lecture_base = len(lecture_ids)
+        lecture_ids.extend(index.lecture_ids)
+
+        doc_lens += index.section('doc_lens')
+        doc_kinds += index.section('doc_kinds')
+        if lecture_base:
+            doc_lectures += _u32_bytes(ordinal + lecture_base for ordinal in index.doc_lectures)
+        else:
+            doc_lectures += index.section('doc_lectures')
+
+        data_base = len(doc_data)
+        doc_offsets.extend(offset + data_base for offset in index.doc_offsets()[1:])
+        doc_data += index.section('doc_data')
+
+        total_tokens += index.avg_doc_len * index.n_docs
+        term_sources.append(index.iter_raw_terms(doc_base))
+        doc_base += index.n_docs
+
+    def merged_terms():
+        # Each source is sorted by term bytes and doc ids grow with source order
+        current, df, chunks = None, 0, []
+        for term, term_df, term_postings in heapq.merge(*term_sources, key=lambda item: item[0]):
+            if term != current:
+                if current is not None:
+                    yield current, df, b''.join(chunks)
+                current, df, chunks = term, 0, []
+            df += term_df
+            chunks.append(term_postings)
+        if current is not None:
+            yield current, df, b''.join(chunks)
+
+    _write_sections(
+        path,
+        total_tokens / doc_base if doc_base else 0.0,
+        bytes(doc_lens),
+        bytes(doc_kinds),
+        bytes(doc_lectures),
+        merged_terms(),
+        doc_offsets.tobytes(),
+        bytes(doc_data),
+        lecture_ids
+    )
+
+
+class SearchIndex:
+    """
+    Read-only, memory-mapped BM25 index.
+    """
+
+    SECTIONS = ('doc_lens', 'doc_kinds', 'doc_lectures', 'terms', 'strings',
+                'postings', 'doc_offsets', 'doc_data', 'lectures')
+
+    def __init__(self, path: str):
+        """
+        Open an index file.
+
+        Args:
+            path: Path to index file written by write_index
+        """
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.n_docs, self.n_terms, self.avg_doc_len, *offsets = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a StudySlice search index: {path}")
+
+        self._bounds = dict(zip(self.SECTIONS, zip(offsets, offsets[1:] + [len(self._mmap)])))
+
+        # uint32 columns read in place through the mapping
+        view = memoryview(self._mmap)
+        self._views = [view]
+        self.doc_lens = self._column(view, 'doc_lens')
+        self.doc_kinds = self._column(view, 'doc_kinds')
+        self.doc_lectures = self._column(view, 'doc_lectures')
+
+        # Only the (small) lecture id list is decoded up front
+        self.lecture_ids = json.loads(self.section('lectures'))
+
+    def _column(self, view: memoryview, name: str) -> memoryview:
+        start, end = self._bounds[name]
+        raw = view[start:end]
+        column = raw.cast('I')
+        self._views.extend((raw, column))
+        return column
+
+    def section(self, name: str) -> bytes:
+        """Raw bytes of one file section."""
+        start, end = self._bounds[name]
+        return self._mmap[start:end]
+
+    def doc_offsets(self) -> array:
+        return array('Q', self.section('doc_offsets'))
+
+    def doc(self, doc_id: int) -> Dict:
+        """Decode one document's metadata."""
+        offsets_start = self._bounds['doc_offsets'][0] + doc_id * DOC_OFFSET.size
+        start, end = struct.unpack_from('<QQ', self._mmap, offsets_start)
+        data_start = self._bounds['doc_data'][0]
+        return json.loads(self._mmap[data_start + start:data_start + end])
+
+    def _term_entry(self, i: int) -> tuple:
+        return TERM_ENTRY.unpack_from(self._mmap, self._bounds['terms'][0] + i * TERM_ENTRY.size)
+
+    def _term_at(self, i: int) -> bytes:
+        str_off, str_len, _, _ = self._term_entry(i)
+        start = self._bounds['strings'][0] + str_off
+        return self._mmap[start:start + str_len]
+
+    def _find_term(self, term: str) -> Optional[int]:
+        """Binary search the sorted term table."""
+        target = term.encode('utf-8')
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_at(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms and self._term_at(lo) == target:
+            return lo
+        return None
+
+    def _postings_bytes(self, df: int, post_off: int) -> bytes:
+        start = self._bounds['postings'][0] + post_off
+        return self._mmap[start:start + df * POSTING.size]
+
+    def postings(self, term: str) -> tuple:
+        """Return (doc_ids, tfs) arrays for a term, empty if unknown."""
+        i = self._find_term(term)
+        if i is None:
+            return array('I'), array('I')
+        _, _, df, post_off = self._term_entry(i)
+        pairs = array('I', self._postings_bytes(df, post_off))
+        return pairs[0::2], pairs[1::2]
+
+    def iter_raw_terms(self, doc_base: int = 0):
+        """
+        Yield (term bytes, df, postings bytes) for every term, in sorted order,
+        with doc ids shifted by doc_base.
+        """
+        for i in range(self.n_terms):
+            str_off, str_len, df, post_off = self._term_entry(i)
+            start = self._bounds['strings'][0] + str_off
+            term_postings = self._postings_bytes(df, post_off)
+            if doc_base:
+                pairs = array('I', term_postings)
+                pairs[0::2] = array('I', (doc_id + doc_base for doc_id in pairs[0::2]))
+                term_postings = pairs.tobytes()
+            yield self._mmap[start:start + str_len], df, term_postings
+
+    def score(self, query: str) -> Dict[int, float]:
+        """
+        Score every document matching the query with BM25.
+
+        Args:
+            query: Free-text query
+
+        Returns:
+            doc_id -> BM25 score
+        """
+        scores = {}
+        doc_lens = self.doc_lens
+        length_norm = K1 * B / self.avg_doc_len if self.avg_doc_len else 0.0
+        base_norm = K1 * (1 - B)
+        for term in set(tokenize(query)):
+            doc_ids, tfs = self.postings(term)
+            if not doc_ids:
+                continue
+            df = len(doc_ids)
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            weight = idf * (K1 + 1)
+            for doc_id, tf in zip(doc_ids, tfs):
+                term_score = weight * tf / (tf + base_norm + length_norm * doc_lens[doc_id])
+                scores[doc_id] = scores.get(doc_id, 0.0) + term_score
+        return scores
+
+    def search(self,
+               query: str,
+               limit: int = 20,
+               lecture_id: Optional[str] = None,
+               kind: Optional[str] = None) -> List[Dict]:
+        """
+        Rank documents against a query with BM25.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of hits
+            lecture_id: Restrict hits to one lecture
+            kind: Restrict hits to 'segment' or 'clip' documents
+
+        Returns:
+            List of document metadata dicts with a 'score' field, best first
+        """
+        ranked = self.top_by_kind(self.score(query), limit, lecture_id)
+        if kind is not None:
+            return ranked[kind]
+        hits = [hit for kind_hits in ranked.values() for hit in kind_hits]
+        return heapq.nlargest(limit, hits, key=lambda hit: hit['score'])
+
+    def top_by_kind(self,
+                    scores: Dict[int, float],
+                    limit: int,
+                    lecture_id: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Heap-select the best scored documents of each kind in one pass.
+        Filters read the kind/lecture columns; only the hits are JSON-decoded.
+
+        Returns:
+            kind -> list of document metadata dicts with 'score', best first
+        """
+        if lecture_id is not None and lecture_id not in self.lecture_ids:
+            return {kind: [] for kind in KINDS}
+
+        doc_kinds = self.doc_kinds
+        buckets = [[] for _ in KINDS]
+        if lecture_id is None:
+            for doc_id in scores:
+                buckets[doc_kinds[doc_id]].append(doc_id)
+        else:
+            lecture_ordinal = self.lecture_ids.index(lecture_id)
+            doc_lectures = self.doc_lectures
+            for doc_id in scores:
+                if doc_lectures[doc_id] == lecture_ordinal:
+                    buckets[doc_kinds[doc_id]].append(doc_id)
+
+        # Keyed selection keeps ties in doc id order instead of comparing
+        # (score, doc_id) tuples, which degrades badly when many scores tie
+        return {
+            kind: [{**self.doc(doc_id), 'score': round(scores[doc_id], 4)}
+                   for doc_id in heapq.nlargest(limit, bucket, key=scores.__getitem__)]
+            for kind, bucket in zip(KINDS, buckets)
+        }
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+
+class ConceptSearch:
+    """
+    Manages per-lecture indexes and the merged global index in one directory.
+    """
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR):
+        """
+        Args:
+            index_dir: Directory holding per-lecture and global index files
+        """
+        self.index_dir = Path(index_dir)
+        self.global_path = self.index_dir / GLOBAL_INDEX_NAME
+        self._index = None
+        # Guards swapping (and closing) the mapped index while Flask threads search it
+        self._lock = threading.Lock()
+
+    def _lecture_path(self, lecture_id: str) -> Path:
+        safe_id = re.sub(r'[^\w\-\.]', '_', lecture_id)
+        return self.index_dir / f"{safe_id}.idx"
+
+    def add_lecture(self, lecture_id: str, segments: List[Dict], clips: List[Dict]) -> int:
+        """
+        Build (or rebuild) the index for one lecture and merge it into the global index.
+
+        A lecture that isn't in the global index yet is appended to it
+        incrementally; re-processing an indexed lecture rebuilds the global
+        index from all lecture files.
+
+        Args:
+            lecture_id: Stable lecture identifier (e.g. transcript name)
+            segments: Normalized transcript segments
+            clips: Selected clips
+
+        Returns:
+            Number of documents indexed for the lecture
+        """
+        docs = []
+        doc_terms = []
+
+        for segment in segments:
+            docs.append({
+                'kind': 'segment',
+                'lecture_id': lecture_id,
+                'start_time': segment['start_time'],
+                'end_time': segment['end_time'],
+                'text': segment['text']
+            })
+            doc_terms.append(tokenize(segment['text']))
+
+        for clip in clips:
+            docs.append({
+                'kind': 'clip',
+                'lecture_id': lecture_id,
+                'clip_id': clip['clip_id'],
+                'concept_type': clip.get('concept_type'),
+                'title': clip.get('title'),
+                'description': clip.get('description'),
+                'start_time': clip['start_time'],
+                'end_time': clip['end_time'],
+                'thumbnail': clip.get('thumbnail')
+            })
+            doc_terms.append(tokenize(f"{clip.get('title', '')} {clip.get('description', '')}"))
+
+        postings = {}
+        for doc_id, terms in enumerate(doc_terms):
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        lecture_path = self._lecture_path(lecture_id)
+        write_index(str(lecture_path), docs, postings, [len(terms) for terms in doc_terms])
+
+        global_index = SearchIndex(str(self.global_path)) if self.global_path.exists() else None
+        if global_index is not None and lecture_id not in global_index.lecture_ids:
+            lecture_index = SearchIndex(str(lecture_path))
+            try:
+                combine_indexes(str(self.global_path), [global_index, lecture_index])
+            finally:
+                lecture_index.close()
+                global_index.close()
+        else:
+            if global_index is not None:
+                global_index.close()
+            self.merge()
+        return len(docs)
+
+    def merge(self):
+        """
+        Rebuild the global index from all per-lecture index files.
+        This is a full rebuild; add_lecture only uses it when a lecture is
+        re-processed or no global index exists yet. Sections are copied as raw
+        bytes, so nothing is re-tokenized or JSON-decoded.
+        """
+        indexes = [
+            SearchIndex(str(lecture_path))
+            for lecture_path in sorted(self.index_dir.glob("*.idx"))
+            if lecture_path.name != GLOBAL_INDEX_NAME
+        ]
+        try:
+            combine_indexes(str(self.global_path), indexes)
+        finally:
+            for index in indexes:
+                index.close()
+
+    def _open(self) -> Optional[SearchIndex]:
+        """
+        Return the mapped global index, remapping it if it was rebuilt.
+        Must be called with self._lock held.
+        """
+        if not self.global_path.exists():
+            return None
+        if self._index is None or os.path.getmtime(self.global_path) != self._index.mtime:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            self._index = SearchIndex(str(self.global_path))
+        return self._index
+
+    def search(self, query: str, limit: int = 20, lecture_id: Optional[str] = None) -> Dict:
+        """
+        Search transcripts and clips.
+
+        Args:
+            query: Free-text query
+            limit: Maximum hits per result kind
+            lecture_id: Restrict hits to one lecture
+
+        Returns:
+            Dictionary with ranked 'timestamps' (segment hits) and 'clips'
+        """
+        # Searches take a few milliseconds, so holding the lock keeps an index
+        # from being closed underneath a concurrent query
+        with self._lock:
+            index = self._open()
+            if index is None:
+                return {'timestamps': [], 'clips': []}
+
+            # Score once, then rank segments and clips in a single pass
+            ranked = index.top_by_kind(index.score(query), limit, lecture_id)
+            return {
+                'timestamps': ranked['segment'],
+                'clips': ranked['clip']
+            }
@@ -16,6 +16,8 @@ Usage:
     python studyslice_ai.py --transcript transcript.json --youtube "https://youtube.com/watch?v=..."
     python studyslice_ai.py --transcript transcript.json --video video.mp4
     python studyslice_ai.py --transcript sunhacks-demo-vid-1.json --video "CS50x 2024 - Lecture 5 - Data Structures.mp4"
+    python studyslice_ai.py --query-catalog --subject Biology --concept-type Definition --min-confidence 0.8
+    python studyslice_ai.py --search "binary search tree"
     
 Requirements:
     - Google Gemini API key in .env file
@@ -28,6 +30,9 @@ import json
 import re
 import subprocess
 import shutil
+import heapq
+import math
+from bisect import bisect_right
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -35,6 +40,9 @@ import argparse
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from clip_catalog import ClipCatalog, DEFAULT_CATALOG_PATH
+from concept_search import ConceptSearch, DEFAULT_INDEX_DIR
+
 # Load environment variables
 load_dotenv()
 
@@ -49,7 +57,13 @@ class StudySliceAI:
                  youtube_url: Optional[str] = None,
                  video_path: Optional[str] = None,
                  output_dir: str = "study_clips",
-                 quality: str = "high"):
+                 quality: str = "high",
+                 renditions: Optional[List[str]] = None,
+                 previews: bool = True,
+                 analysis_mode: str = "flat",
+                 windowing: str = "adaptive",
+                 catalog_path: Optional[str] = DEFAULT_CATALOG_PATH,
+                 search_index_dir: Optional[str] = DEFAULT_INDEX_DIR):
         """
         Initialize StudySlice AI processor.
         
@@ -59,17 +73,65 @@ class StudySliceAI:
             video_path: Path to local video file
             output_dir: Directory for output clips
             quality: Video quality ('high', 'medium', 'low')
+            renditions: Rendition ladder to encode from one decode per clip
+                (e.g. ['high', 'medium', 'low']); overrides quality when set
+            previews: Generate a thumbnail and scrub-preview sprite per clip
+            analysis_mode: 'flat' (every window) or 'hierarchical' (coarse
+                section scoring, then fine windows in the best sections)
+            windowing: 'adaptive' (pause-aware, token-targeted chunks) or
+                'fixed' (window_s windows every stride_s)
+            catalog_path: SQLite clip catalog to upsert clips into (None disables)
+            search_index_dir: Directory for BM25 concept search indexes (None disables)
         """
         self.transcript_path = transcript_path
         self.youtube_url = youtube_url
         self.video_path = video_path
         self.output_dir = output_dir
         self.quality = quality
+        self.renditions = renditions
+        self.previews = previews
+        self.analysis_mode = analysis_mode
+        self.windowing = windowing
+        self.model_calls = 0
+        self.section_summaries = []
+        self.catalog_path = catalog_path
+        self.search_index_dir = search_index_dir
         
         # Configuration
         self.window_s = 120  # 2-minute analysis windows
         self.stride_s = 30   # 30-second stride
+        
+        # Adaptive windowing: segments end on pauses, chunks target a token count
+        self.pause_s = 0.8  # Gap between words that counts as a pause
+        self.min_segment_words = 20  # Don't cut segments shorter than this on a pause
+        self.target_chunk_tokens = 600  # Target tokens per analysis chunk
+        self.max_chunk_s = 300  # Hard cap on chunk duration
         self.clip_duration = 40  # 40-second clips
+        self.max_clips = 10  # Clips selected per lecture
+        self.max_per_type = 3  # Diversity cap per concept type
+        # Total clip duration budget; clips have a fixed length, so this is
+        # enforced as a clip count (clip_budget_s // clip_duration)
+        self.clip_budget_s = self.max_clips * self.clip_duration
+        self.candidate_pool = 200  # Top-k concepts considered for scheduling
+        
+        # Hierarchical analysis: coarse sections scored in batches, then
+        # ceil(sqrt(sections)) top sections drilled into with fine windows
+        self.section_s = 600  # 10-minute sections
+        self.sections_per_call = 6  # Sections scored per coarse model call
+        
+        # Rendition ladder: CRF, max output height and audio bitrate per quality
+        self.rendition_ladder = {
+            'high': {'crf': 18, 'height': 1080, 'audio_bitrate': '192k'},
+            'medium': {'crf': 23, 'height': 720, 'audio_bitrate': '128k'},
+            'low': {'crf': 28, 'height': 480, 'audio_bitrate': '96k'}
+        }
+        
+        # Thumbnails and scrub-preview sprite sheets
+        self.thumbnail_width = 320
+        self.sprite_interval_s = 2  # One sprite frame every 2 seconds
+        self.sprite_frame_width = 160
+        self.sprite_columns = 5
+        self.min_thumbnail_seek_s = 2  # Shorter clip ranges use their first frame
         
         # Educational keywords for universal subject detection
         self.educational_keywords = [
@@ -115,6 +177,8 @@ class StudySliceAI:
         
         print(f"📊 Processing {len(items)} transcript items...")
         
+        adaptive = self.windowing == 'adaptive'
+        
         for item in items:
             if item['type'] == 'pronunciation':
                 # Add word to current segment
@@ -122,9 +186,26 @@ class StudySliceAI:
                 start_time = float(item.get('start_time', 0))
                 end_time = float(item.get('end_time', start_time))
                 
+                # Adaptive: close the segment on a natural pause before this word
+                if adaptive and word_count >= self.min_segment_words:
+                    pause = start_time - current_segment["end"]
+                    if pause >= self.pause_s:
+                        segments.append({
+                            "start_time": current_segment["start"],
+                            "end_time": current_segment["end"],
+                            "text": current_segment["text"].strip()
+                        })
+                        current_segment = {"start": start_time, "end": start_time, "text": ""}
+                        word_count = 0
+                
                 if current_segment["text"] == "":
                     current_segment["start"] = start_time
                     
+                    # Record the gap after the previous segment, whether it was
+                    # closed by a pause or by the word/duration cap
+                    if adaptive and segments and 'pause_after' not in segments[-1]:
+                        segments[-1]['pause_after'] = round(start_time - segments[-1]['end_time'], 3)
+                    
                 current_segment["text"] += word + " "
                 current_segment["end"] = end_time
                 word_count += 1
@@ -163,6 +244,9 @@ class StudySliceAI:
         Returns:
             List of analysis chunks with metadata
         """
+        if self.windowing == 'adaptive':
+            return self.create_adaptive_chunks(segments)
+            
         print(f"🧩 Creating analysis chunks...")
         
         chunks = []
@@ -192,6 +276,56 @@ class StudySliceAI:
         print(f"✅ Created {len(chunks)} analysis chunks")
         return chunks
         
+    def create_adaptive_chunks(self, segments: List[Dict]) -> List[Dict]:
+        """
+        Create analysis chunks sized by token count with boundaries on pauses.
+        
+        Segments are packed until the chunk reaches ~75% of target_chunk_tokens,
+        then the chunk closes at the next segment followed by a pause. Chunks
+        are force-closed at 125% of the target or max_chunk_s. Chunks don't
+        overlap: each one starts at the segment after the previous boundary,
+        which is normally the first sentence after a pause.
+        
+        Args:
+            segments: List of transcript segments
+            
+        Returns:
+            List of analysis chunks with the same fields as fixed windows
+        """
+        print(f"🧩 Creating adaptive analysis chunks...")
+        
+        min_tokens = self.target_chunk_tokens * 0.75
+        max_tokens = self.target_chunk_tokens * 1.25
+        
+        chunks = []
+        chunk_segments = []
+        tokens = 0
+        
+        for i, segment in enumerate(segments):
+            chunk_segments.append(segment)
+            tokens += self._estimate_tokens(segment['text'])
+            
+            at_pause = segment.get('pause_after', 0) >= self.pause_s
+            duration = segment['end_time'] - chunk_segments[0]['start_time']
+            last = i == len(segments) - 1
+            
+            if last or (tokens >= min_tokens and at_pause) or tokens >= max_tokens or duration >= self.max_chunk_s:
+                chunks.append({
+                    'start_time': chunk_segments[0]['start_time'],
+                    'end_time': segment['end_time'],
+                    'text': " ".join([s['text'] for s in chunk_segments]),
+                    'segments': chunk_segments
+                })
+                chunk_segments = []
+                tokens = 0
+                    
+        print(f"✅ Created {len(chunks)} adaptive analysis chunks")
+        return chunks
+        
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough model token estimate (~4 tokens per 3 words)."""
+        return math.ceil(len(text.split()) * 4 / 3)
+        
     def analyze_educational_content(self, chunks: List[Dict]) -> List[Dict]:
         """
         Analyze chunks using AI to identify educational concepts.
@@ -215,52 +349,192 @@ class StudySliceAI:
         for i, chunk in enumerate(chunks):
             print(f"🔍 Analyzing chunk {i+1}/{len(chunks)}")
             
-            # AI analysis prompt
+            try:
+                educational_concepts.extend(self._analyze_chunk(chunk, i, subject))
+            except Exception as e:
+                print(f"⚠️ Error analyzing chunk {i+1}: {e}")
+                continue
+                
+        print(f"✅ Found {len(educational_concepts)} high-value concepts")
+        return educational_concepts
+        
+    def analyze_educational_content_hierarchical(self, segments: List[Dict], chunks: List[Dict]) -> List[Dict]:
+        """
+        Coarse-to-fine analysis for long lectures.
+        
+        1. Map: score and summarize 10-minute sections, several per model call.
+        2. Reduce: drill into the fine analysis windows of only the
+           ceil(sqrt(sections)) highest-scoring sections.
+        
+        The fine pass dominates the call count and grows with the square root
+        of the lecture duration instead of linearly.
+        
+        Args:
+            segments: List of transcript segments
+            chunks: List of analysis chunks
+            
+        Returns:
+            List of educational concepts with metadata
+        """
+        print(f"🧠 Analyzing educational content with AI (hierarchical)...")
+        
+        sample_text = " ".join([chunk['text'] for chunk in chunks[:3]])
+        subject = self._detect_subject(sample_text)
+        
+        print(f"📚 Subject detected: {subject}")
+        
+        # Build non-overlapping sections from the transcript segments
+        sections = {}
+        for segment in segments:
+            index = int(segment['start_time'] // self.section_s)
+            sections.setdefault(index, []).append(segment['text'])
+        sections = [
+            {
+                'index': index,
+                'start_time': index * self.section_s,
+                'end_time': (index + 1) * self.section_s,
+                'text': " ".join(texts),
+                'score': 0,
+                'summary': ''
+            }
+            for index, texts in sorted(sections.items())
+        ]
+        
+        # Map: score sections in batches
+        for batch_start in range(0, len(sections), self.sections_per_call):
+            batch = sections[batch_start:batch_start + self.sections_per_call]
+            print(f"🗺️ Scoring sections {batch_start+1}-{batch_start+len(batch)}/{len(sections)}")
+            
+            section_text = "\n\n".join(
+                f"Section {section['index']}:\n{section['text']}" for section in batch
+            )
             prompt = f"""
-            Analyze this {subject} educational content and identify key learning concepts.
+            Score these sections of a {subject} lecture by how much valuable educational content they contain.
             
-            Content: {chunk['text']}
+            {section_text}
             
-            For each significant educational concept, provide:
-            1. Type (Example, Definition, Question, Process, Summary)
-            2. Title (specific concept name)
-            3. Description (what students learn)
-            4. Importance (1-10 scale)
+            For each section, provide:
+            1. Section (the section number)
+            2. Score (1-10 scale, how many clip-worthy concepts it teaches)
+            3. Summary (one sentence)
             
-            Focus on concepts that would be valuable as 40-second study clips.
-            Return as JSON array with fields: type, title, description, importance
+            Return as JSON array with fields: section, score, summary
             """
             
             try:
-                response = self.model.generate_content(prompt)
-                
-                # Parse AI response
-                response_text = response.text.strip()
-                if response_text.startswith('```json'):
-                    response_text = response_text.split('```json')[1].split('```')[0]
-                elif response_text.startswith('```'):
-                    response_text = response_text.split('```')[1].split('```')[0]
-                
-                concepts = json.loads(response_text)
+                results = {
+                    int(item['section']): item
+                    for item in self._parse_json_response(self._generate_content(prompt))
+                }
+                for section in batch:
+                    result = results.get(section['index'], {})
+                    section['score'] = float(result.get('score', 0))
+                    section['summary'] = result.get('summary', '')
+            except Exception as e:
+                print(f"⚠️ Error scoring sections {batch_start+1}-{batch_start+len(batch)}: {e}")
+                continue
+        
+        # Reduce: drill into the best sections only
+        drill_count = math.ceil(math.sqrt(len(sections)))
+        drill_sections = heapq.nlargest(drill_count, sections, key=lambda section: section['score'])
+        print(f"🎯 Drilling into {len(drill_sections)}/{len(sections)} sections: "
+              f"{sorted(section['index'] for section in drill_sections)}")
+        
+        # Reported with the pipeline results
+        self.section_summaries = [
+            {key: section[key] for key in ('index', 'start_time', 'end_time', 'score', 'summary')}
+            for section in sections
+        ]
+        
+        educational_concepts = []
+        
+        for i, chunk in enumerate(chunks):
+            section = next(
+                (s for s in drill_sections if s['start_time'] <= chunk['start_time'] < s['end_time']),
+                None
+            )
+            if section is None:
+                continue
                 
-                # Add metadata to concepts
-                for concept in concepts:
-                    if concept.get('importance', 0) >= 7:  # High-value concepts only
-                        educational_concepts.append({
-                            **concept,
-                            'chunk_index': i,
-                            'start_time': chunk['start_time'],
-                            'end_time': chunk['end_time'],
-                            'confidence': min(concept.get('importance', 5) / 10.0, 1.0)
-                        })
-                        
+            print(f"🔍 Analyzing chunk {i+1}/{len(chunks)}")
+            
+            try:
+                # The coarse summary gives the fine pass its section context
+                educational_concepts.extend(self._analyze_chunk(chunk, i, subject, section['summary']))
             except Exception as e:
                 print(f"⚠️ Error analyzing chunk {i+1}: {e}")
                 continue
                 
-        print(f"✅ Found {len(educational_concepts)} high-value concepts")
+        print(f"✅ Found {len(educational_concepts)} high-value concepts "
+              f"with {self.model_calls} model calls (flat mode: {len(chunks)})")
         return educational_concepts
         
+    def _analyze_chunk(self,
+                       chunk: Dict,
+                       chunk_index: int,
+                       subject: str,
+                       section_summary: str = "") -> List[Dict]:
+        """
+        Identify high-value educational concepts in one analysis chunk.
+        
+        Args:
+            chunk: Analysis chunk
+            chunk_index: Index of the chunk
+            subject: Detected academic subject
+            section_summary: Summary of the surrounding section (hierarchical mode)
+            
+        Returns:
+            List of educational concepts with metadata
+        """
+        context = f"Section context: {section_summary}" if section_summary else ""
+        
+        # AI analysis prompt
+        prompt = f"""
+            Analyze this {subject} educational content and identify key learning concepts.
+            {context}
+            Content: {chunk['text']}
+            
+            For each significant educational concept, provide:
+            1. Type (Example, Definition, Question, Process, Summary)
+            2. Title (specific concept name)
+            3. Description (what students learn)
+            4. Importance (1-10 scale)
+            
+            Focus on concepts that would be valuable as 40-second study clips.
+            Return as JSON array with fields: type, title, description, importance
+            """
+        
+        concepts = self._parse_json_response(self._generate_content(prompt))
+        
+        # Add metadata to concepts
+        return [
+            {
+                **concept,
+                'chunk_index': chunk_index,
+                'start_time': chunk['start_time'],
+                'end_time': chunk['end_time'],
+                'confidence': min(concept.get('importance', 5) / 10.0, 1.0)
+            }
+            for concept in concepts
+            if concept.get('importance', 0) >= 7  # High-value concepts only
+        ]
+        
+    def _generate_content(self, prompt: str) -> str:
+        """Call the model, counting calls for analysis cost reporting."""
+        self.model_calls += 1
+        response = self.model.generate_content(prompt)
+        return response.text
+        
+    def _parse_json_response(self, response_text: str):
+        """Parse a JSON model response, stripping Markdown code fences."""
+        response_text = response_text.strip()
+        if response_text.startswith('```json'):
+            response_text = response_text.split('```json')[1].split('```')[0]
+        elif response_text.startswith('```'):
+            response_text = response_text.split('```')[1].split('```')[0]
+        
+        return json.loads(response_text)
+        
     def _detect_subject(self, text: str) -> str:
         """Detect academic subject from content."""
         text_lower = text.lower()
@@ -290,6 +564,11 @@ class StudySliceAI:
         """
         Select the best educational concepts for video clips.
         
+        Uses weighted interval scheduling so selected clips never overlap:
+        total importance is maximized exactly over the candidate pool, subject
+        to the clip budget (a clip count, as every clip lasts clip_duration)
+        and at most max_per_type clips per concept type.
+        
         Args:
             concepts: List of educational concepts
             
@@ -298,45 +577,116 @@ class StudySliceAI:
         """
         print(f"🎯 Selecting best clips from {len(concepts)} concepts...")
         
-        # Sort by importance and confidence
-        sorted_concepts = sorted(
-            concepts, 
-            key=lambda x: (x.get('confidence', 0), x.get('importance', 0)), 
-            reverse=True
-        )
+        # Heap-based top-k keeps scheduling cheap for very long concept lists
+        ranking_key = lambda x: (x.get('confidence', 0), x.get('importance', 0))
+        if len(concepts) > self.candidate_pool:
+            top_concepts = heapq.nlargest(self.candidate_pool, concepts, key=ranking_key)
+        else:
+            top_concepts = sorted(concepts, key=ranking_key, reverse=True)
         
-        # Select diverse concept types
-        selected_clips = []
-        concept_types = {}
+        # Calculate clip timing for each candidate
+        candidates = []
+        for concept in top_concepts:
+            clip_start = max(0, concept['start_time'] - 5)  # 5s buffer
+            candidates.append({
+                'concept': concept,
+                'concept_type': concept.get('type', 'Example'),
+                'start': clip_start,
+                'end': clip_start + self.clip_duration,
+                'weight': concept.get('importance', concept.get('confidence', 0) * 10)
+            })
+        
+        # Fixed-length clips turn the duration budget into a clip count
+        max_clips = min(self.max_clips, int(self.clip_budget_s // self.clip_duration))
+        scheduled = self._schedule_intervals(candidates, max_clips, self.max_per_type)
+        
+        # Keep the ranking order of the original selector for clip ids
+        scheduled.sort(key=lambda c: ranking_key(c['concept']), reverse=True)
         
-        for concept in sorted_concepts:
-            concept_type = concept.get('type', 'Example')
+        selected_clips = []
+        for candidate in scheduled:
+            concept = candidate['concept']
+            concept_type = candidate['concept_type']
             
-            # Limit concepts per type for diversity
-            if concept_types.get(concept_type, 0) < 3 and len(selected_clips) < 10:
-                
-                # Calculate clip timing
-                clip_start = max(0, concept['start_time'] - 5)  # 5s buffer
-                clip_end = clip_start + self.clip_duration
-                
-                clip_data = {
-                    'clip_id': f"concept_{len(selected_clips)+1:02d}",
-                    'concept_type': concept_type,
-                    'title': f"{concept_type}: {concept['title']}",
-                    'description': concept['description'],
-                    'start_time': clip_start,
-                    'end_time': clip_end,
-                    'duration': self.clip_duration,
-                    'confidence': concept['confidence'],
-                    'chunk_index': concept['chunk_index']
-                }
-                
-                selected_clips.append(clip_data)
-                concept_types[concept_type] = concept_types.get(concept_type, 0) + 1
+            clip_data = {
+                'clip_id': f"concept_{len(selected_clips)+1:02d}",
+                'concept_type': concept_type,
+                'title': f"{concept_type}: {concept['title']}",
+                'description': concept['description'],
+                'start_time': candidate['start'],
+                'end_time': candidate['end'],
+                'duration': self.clip_duration,
+                'confidence': concept['confidence'],
+                'chunk_index': concept['chunk_index']
+            }
+            
+            selected_clips.append(clip_data)
                 
-        print(f"✅ Selected {len(selected_clips)} diverse educational clips")
+        print(f"✅ Selected {len(selected_clips)} diverse, non-overlapping educational clips")
         return selected_clips
         
+    def _schedule_intervals(self,
+                            candidates: List[Dict],
+                            max_clips: int,
+                            max_per_type: int) -> List[Dict]:
+        """
+        Weighted interval scheduling with caps on the number of intervals
+        overall and per concept type.
+        
+        O(n log n) to sort and find predecessors, plus a DP over
+        (interval, per-type counts): at most (max_per_type + 1) ** types states
+        per interval, which stays small for the five concept types.
+        
+        Args:
+            candidates: Dicts with 'start', 'end', 'weight' and 'concept_type'
+            max_clips: Maximum number of intervals to select
+            max_per_type: Maximum number of intervals per concept type
+            
+        Returns:
+            Non-overlapping subset of candidates with maximum total weight
+        """
+        intervals = sorted(candidates, key=lambda c: c['end'])
+        ends = [c['end'] for c in intervals]
+        n = len(intervals)
+        types = sorted({c['concept_type'] for c in intervals})
+        type_index = {concept_type: i for i, concept_type in enumerate(types)}
+        
+        # predecessor[j] = number of intervals (in end order) finishing by the start of interval j
+        predecessor = [bisect_right(ends, intervals[j]['start'], 0, j) for j in range(n)]
+        
+        # best[j][counts] = max weight using the first j intervals with exactly
+        # counts[t] intervals of type t
+        empty = (0,) * len(types)
+        best = [{empty: 0.0}]
+        for j in range(1, n + 1):
+            interval = intervals[j - 1]
+            t = type_index[interval['concept_type']]
+            row = dict(best[j - 1])
+            for counts, weight in best[predecessor[j - 1]].items():
+                if counts[t] >= max_per_type or sum(counts) >= max_clips:
+                    continue
+                taken = counts[:t] + (counts[t] + 1,) + counts[t + 1:]
+                total = weight + interval['weight']
+                if total > row.get(taken, -1.0):
+                    row[taken] = total
+            best.append(row)
+        
+        # Backtrack from the best reachable count vector
+        selected = []
+        counts = max(best[n], key=best[n].get)
+        j = n
+        while j > 0 and any(counts):
+            if best[j - 1].get(counts) == best[j][counts]:
+                j -= 1
+            else:
+                interval = intervals[j - 1]
+                selected.append(interval)
+                t = type_index[interval['concept_type']]
+                counts = counts[:t] + (counts[t] - 1,) + counts[t + 1:]
+                j = predecessor[j - 1]
+                
+        return selected
+        
     def generate_clips_json(self, clips: List[Dict], subject: str) -> str:
         """
         Generate JSON metadata file for clips.
@@ -358,6 +708,7 @@ class StudySliceAI:
         # Create metadata structure
         clips_data = {
             "lecture_info": {
+                "lecture_id": basename,
                 "title": f"{subject} - Educational Concepts",
                 "subject": subject,
                 "duration_hours": round(clips[-1]['end_time'] / 3600, 1) if clips else 0,
@@ -372,8 +723,51 @@ class StudySliceAI:
             json.dump(clips_data, f, indent=2, ensure_ascii=False)
             
         print(f"💾 Generated clips JSON: {clips_json_path}")
+        
+        # Upsert into the indexed clip catalog, keyed by transcript name
+        self.update_clip_catalog(clips_json_path)
+                
         return clips_json_path
         
+    def update_clip_catalog(self, clips_json_path: str) -> int:
+        """
+        Upsert a clips JSON file into the clip catalog. Called again after
+        extraction so rendition and preview paths reach the catalog.
+        
+        Args:
+            clips_json_path: Path to clips JSON metadata
+            
+        Returns:
+            Number of clips indexed
+        """
+        if not self.catalog_path:
+            return 0
+            
+        try:
+            indexed = ClipCatalog(self.catalog_path).import_clips_json(clips_json_path)
+            print(f"🗂️ Indexed {indexed} clips in catalog: {self.catalog_path}")
+            return indexed
+        except Exception as e:
+            print(f"⚠️ Error updating clip catalog: {e}")
+            return 0
+        
+    def build_search_index(self, segments: List[Dict], clips: List[Dict]) -> int:
+        """
+        Index transcript segments and clips for concept search, then merge
+        this lecture into the global search index.
+        
+        Args:
+            segments: Normalized transcript segments
+            clips: List of selected clips
+            
+        Returns:
+            Number of documents indexed for this lecture
+        """
+        lecture_id = Path(self.transcript_path).stem
+        indexed = ConceptSearch(self.search_index_dir).add_lecture(lecture_id, segments, clips)
+        print(f"🔎 Indexed {indexed} documents for concept search: {self.search_index_dir}")
+        return indexed
+        
     def download_video(self) -> str:
         """
         Download video from YouTube URL.
@@ -442,14 +836,15 @@ class StudySliceAI:
         # Create output directory
         Path(self.output_dir).mkdir(exist_ok=True)
         
-        # Quality settings
-        quality_settings = {
-            'high': ['-c:v', 'libx264', '-crf', '18', '-c:a', 'aac', '-b:a', '192k'],
-            'medium': ['-c:v', 'libx264', '-crf', '23', '-c:a', 'aac', '-b:a', '128k'],
-            'low': ['-c:v', 'libx264', '-crf', '28', '-c:a', 'aac', '-b:a', '96k']
-        }
+        # Quality settings come from the rendition ladder (single quality keeps the source size)
+        quality = self.rendition_ladder.get(self.quality, self.rendition_ladder['high'])
+        settings = ['-c:v', 'libx264', '-crf', str(quality['crf']),
+                    '-c:a', 'aac', '-b:a', quality['audio_bitrate']]
+        # yuv420p needs even dimensions; odd-sized sources are rounded down
+        even_size = "scale='trunc(iw/2)*2':'trunc(ih/2)*2'"
         
-        settings = quality_settings.get(self.quality, quality_settings['high'])
+        # Source duration clamps preview seeks for clips running past the end
+        source_duration = self._probe_duration(video_path) if self.previews else None
         
         # Extract clips
         successful_clips = []
@@ -460,23 +855,57 @@ class StudySliceAI:
             
             # Generate safe filename
             safe_title = re.sub(r'[^\w\-_\.]', '_', clip['title'])
+            
+            if self.renditions:
+                renditions = self._extract_clip_renditions(video_path, clip, safe_title, source_duration)
+                if renditions:
+                    successful_clips.append({
+                        'clip_id': clip['clip_id'],
+                        'title': clip['title'],
+                        'file': renditions[self.renditions[0]]['file'],
+                        'size_mb': round(sum(r['size_mb'] for r in renditions.values()), 2),
+                        'renditions': renditions
+                    })
+                    clip['renditions'] = renditions
+                    for name, rendition in renditions.items():
+                        print(f"   ✅ [{name}] {Path(rendition['file']).name} ({rendition['size_mb']:.1f}MB)")
+                else:
+                    failed_clips.append(clip['clip_id'])
+                    print(f"   ❌ Failed to extract {clip['clip_id']}")
+                continue
+                
             output_file = Path(self.output_dir) / f"{clip['clip_id']}_{safe_title}.mp4"
             
-            # FFmpeg command
+            # FFmpeg command (fast input seek, so previews can share the decode)
             cmd = [
                 'ffmpeg', '-y',
-                '-i', video_path,
                 '-ss', str(clip['start_time']),
                 '-t', str(clip['duration']),
+                '-i', video_path
+            ]
+            
+            preview_outputs, previews = [], None
+            if self.previews:
+                preview_filters, preview_outputs, previews = self._preview_graph("vp", clip, source_duration)
+                cmd += [
+                    '-filter_complex', ";".join([f"[0:v]split=2[vsrc][vp]", f"[vsrc]{even_size}[vmain]", *preview_filters]),
+                    '-map', '[vmain]', '-map', '0:a?'
+                ]
+            else:
+                cmd += ['-vf', even_size]
+                
+            cmd += [
                 *settings,
                 '-avoid_negative_ts', 'make_zero',
-                str(output_file)
+                str(output_file),
+                *preview_outputs
             ]
             
             try:
                 result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
                 
-                if result.returncode == 0 and output_file.exists():
+                if self._outputs_ok(result, [output_file]):
+                    self._record_previews(clip, previews)
                     file_size = output_file.stat().st_size / (1024 * 1024)
                     successful_clips.append({
                         'clip_id': clip['clip_id'],
@@ -493,6 +922,18 @@ class StudySliceAI:
                 failed_clips.append(clip['clip_id'])
                 print(f"   ⏰ Timeout extracting {clip['clip_id']}")
                 
+        # Previews for clips whose extraction didn't already produce them,
+        # in one batched pass over the source
+        if self.previews:
+            pending = [clip for clip in clips if 'thumbnail' not in clip]
+            if pending:
+                self.generate_previews(video_path, pending)
+                
+        # Record rendition and preview files in the clips JSON
+        if self.renditions or self.previews:
+            with open(clips_json_path, 'w', encoding='utf-8') as f:
+                json.dump(clips_data, f, indent=2, ensure_ascii=False)
+                
         # Results summary
         total_size = sum(clip['size_mb'] for clip in successful_clips)
         
@@ -501,6 +942,7 @@ class StudySliceAI:
             'failed': len(failed_clips),
             'total_size_mb': round(total_size, 1),
             'output_directory': self.output_dir,
+            'renditions': self.renditions or [self.quality],
             'clips': successful_clips
         }
         
@@ -512,6 +954,258 @@ class StudySliceAI:
         
         return results
         
+    def _extract_clip_renditions(self,
+                                 video_path: str,
+                                 clip: Dict,
+                                 safe_title: str,
+                                 source_duration: Optional[float] = None) -> Dict:
+        """
+        Encode every rendition of one clip from a single decode.
+        
+        The clip range is decoded once (fast input seek) and the video stream
+        is split into one scaled encode per rendition. When previews are
+        enabled, the thumbnail and sprite sheet come from the same decode.
+        
+        Args:
+            video_path: Path to source video
+            clip: Clip metadata
+            safe_title: Filesystem-safe clip title
+            source_duration: Source length in seconds, used to clamp preview seeks
+            
+        Returns:
+            Mapping of rendition name to file and size, empty on failure
+        """
+        ladder = [(name, self.rendition_ladder[name]) for name in self.renditions]
+        branches = len(ladder) + (1 if self.previews else 0)
+        
+        # [0:v]split=N[v0][v1]...;[v0]scale=-2:'trunc(min(ih,1080)/2)*2'[out0];...
+        # (yuv420p needs even dimensions, so the capped height is rounded down to even)
+        split_labels = "".join(f"[v{i}]" for i in range(branches))
+        filters = [f"[0:v]split={branches}{split_labels}"]
+        for i, (_, settings) in enumerate(ladder):
+            filters.append(f"[v{i}]scale=-2:'trunc(min(ih,{settings['height']})/2)*2'[out{i}]")
+            
+        preview_outputs, previews = [], None
+        if self.previews:
+            preview_filters, preview_outputs, previews = self._preview_graph(f"v{len(ladder)}", clip, source_duration)
+            filters += preview_filters
+        
+        cmd = [
+            'ffmpeg', '-y',
+            '-ss', str(clip['start_time']),
+            '-t', str(clip['duration']),
+            '-i', video_path,
+            '-filter_complex', ";".join(filters)
+        ]
+        
+        output_files = {}
+        for i, (name, settings) in enumerate(ladder):
+            output_file = Path(self.output_dir) / f"{clip['clip_id']}_{safe_title}_{name}.mp4"
+            output_files[name] = output_file
+            cmd += [
+                '-map', f"[out{i}]", '-map', '0:a?',
+                '-c:v', 'libx264', '-crf', str(settings['crf']),
+                '-c:a', 'aac', '-b:a', settings['audio_bitrate'],
+                '-avoid_negative_ts', 'make_zero',
+                str(output_file)
+            ]
+        cmd += preview_outputs
+        
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120 * len(ladder))
+        except subprocess.TimeoutExpired:
+            print(f"   ⏰ Timeout extracting {clip['clip_id']}")
+            result = None
+            
+        # Success is decided by the rendition files only; previews are best-effort
+        if result is None or not self._outputs_ok(result, list(output_files.values())):
+            for output_file in output_files.values():
+                output_file.unlink(missing_ok=True)
+            return {}
+            
+        self._record_previews(clip, previews)
+            
+        return {
+            name: {
+                'file': str(output_file),
+                'size_mb': round(output_file.stat().st_size / (1024 * 1024), 2),
+                'crf': self.rendition_ladder[name]['crf'],
+                'max_height': self.rendition_ladder[name]['height']
+            }
+            for name, output_file in output_files.items()
+        }
+        
+    def _preview_graph(self,
+                       source_label: str,
+                       clip: Dict,
+                       source_duration: Optional[float] = None) -> Tuple[List[str], List[str], Dict]:
+        """
+        Build the filter graph and outputs for one clip's thumbnail and sprite sheet.
+        
+        The thumbnail is taken from the middle of the part of the clip that
+        exists in the source, or from the first frame when that part is short
+        or the source duration is unknown.
+        
+        Args:
+            source_label: Filter graph label of the clip's decoded video stream
+            clip: Clip metadata
+            source_duration: Source length in seconds, if known
+            
+        Returns:
+            (filters, ffmpeg output args, clip JSON preview fields)
+        """
+        preview_dir = Path(self.output_dir) / "previews"
+        preview_dir.mkdir(parents=True, exist_ok=True)
+        
+        clip_id = clip['clip_id']
+        thumbnail_file = preview_dir / f"{clip_id}_thumb.jpg"
+        sprite_file = preview_dir / f"{clip_id}_sprite.jpg"
+        
+        # Clips near the end can run past the source (clip_start + clip_duration)
+        if source_duration is not None:
+            available = max(0.0, min(clip['duration'], source_duration - clip['start_time']))
+            thumbnail_seek = available / 2 if available >= self.min_thumbnail_seek_s else 0
+        else:
+            available = clip['duration']
+            thumbnail_seek = 0
+        
+        frames = max(1, math.ceil(available / self.sprite_interval_s))
+        columns = min(self.sprite_columns, frames)
+        rows = math.ceil(frames / columns)
+        
+        filters = [
+            f"[{source_label}]split=2[{clip_id}_t][{clip_id}_s]",
+            # Thumbnail from the middle of the available clip range
+            f"[{clip_id}_t]trim=start={thumbnail_seek},setpts=PTS-STARTPTS,"
+            f"scale={self.thumbnail_width}:-2[{clip_id}_thumb]",
+            f"[{clip_id}_s]fps=1/{self.sprite_interval_s},scale={self.sprite_frame_width}:-2,"
+            f"tile={columns}x{rows}[{clip_id}_sprite]"
+        ]
+        outputs = [
+            '-map', f"[{clip_id}_thumb]", '-frames:v', '1', str(thumbnail_file),
+            '-map', f"[{clip_id}_sprite]", '-frames:v', '1', str(sprite_file)
+        ]
+        previews = {
+            'thumbnail': str(thumbnail_file),
+            'preview_sprite': {
+                'file': str(sprite_file),
+                'interval_s': self.sprite_interval_s,
+                'frame_width': self.sprite_frame_width,
+                'columns': columns,
+                'rows': rows
+            }
+        }
+        return filters, outputs, previews
+        
+    def generate_previews(self, video_path: str, clips: List[Dict]) -> int:
+        """
+        Generate thumbnails and scrub-preview sprite sheets for clips in one
+        batched FFmpeg pass: every clip range is opened with a fast input seek,
+        so only the selected ranges are decoded.
+        
+        Preview paths are added to each clip dict.
+        
+        Args:
+            video_path: Path to source video
+            clips: Clips to generate previews for
+            
+        Returns:
+            Number of clips with previews
+        """
+        print(f"🖼️ Generating previews for {len(clips)} clips...")
+        
+        source_duration = self._probe_duration(video_path)
+        if source_duration is not None:
+            # Ranges starting past the end of the source have no frames to preview
+            clips = [clip for clip in clips if clip['start_time'] < source_duration]
+            if not clips:
+                return 0
+        
+        generated = self._generate_preview_batch(video_path, clips, source_duration)
+        
+        # One bad range can fail the whole batched run; retry the missing
+        # clips one by one so they don't lose their previews
+        missing = [clip for clip in clips if 'thumbnail' not in clip]
+        if missing and len(clips) > 1:
+            for clip in missing:
+                generated += self._generate_preview_batch(video_path, [clip], source_duration)
+                
+        print(f"   ✅ Generated previews for {generated} clips")
+        return generated
+        
+    def _generate_preview_batch(self,
+                                video_path: str,
+                                clips: List[Dict],
+                                source_duration: Optional[float]) -> int:
+        """
+        Run one FFmpeg process producing previews for several clips.
+        
+        Args:
+            video_path: Path to source video
+            clips: Clips to generate previews for
+            source_duration: Source length in seconds, if known
+            
+        Returns:
+            Number of clips whose previews were written
+        """
+        cmd = ['ffmpeg', '-y']
+        for clip in clips:
+            cmd += ['-ss', str(clip['start_time']), '-t', str(clip['duration']), '-i', video_path]
+        
+        filters, outputs, previews = [], [], []
+        for i, clip in enumerate(clips):
+            clip_filters, clip_outputs, clip_previews = self._preview_graph(f"{i}:v", clip, source_duration)
+            filters += clip_filters
+            outputs += clip_outputs
+            previews.append(clip_previews)
+            
+        cmd += ['-filter_complex', ";".join(filters), *outputs]
+        
+        try:
+            subprocess.run(cmd, capture_output=True, text=True, timeout=60 + 30 * len(clips))
+        except subprocess.TimeoutExpired:
+            print(f"   ⏰ Timeout generating previews")
+            
+        # Judge each clip by its own files, not the process exit code
+        return sum(self._record_previews(clip, clip_previews) for clip, clip_previews in zip(clips, previews))
+        
+    def _record_previews(self, clip: Dict, previews: Optional[Dict]) -> bool:
+        """Add preview fields to a clip if both preview images were written."""
+        if not previews:
+            return False
+        files = [Path(previews['thumbnail']), Path(previews['preview_sprite']['file'])]
+        if not all(f.exists() and f.stat().st_size > 0 for f in files):
+            return False
+        clip.update(previews)
+        return True
+        
+    def _outputs_ok(self, result: subprocess.CompletedProcess, output_files: List[Path]) -> bool:
+        """
+        Check that FFmpeg produced every clip output.
+        
+        A non-zero exit can come from a best-effort preview output, so the
+        clip files are then verified by probing them instead.
+        """
+        if not all(f.exists() and f.stat().st_size > 0 for f in output_files):
+            return False
+        if result.returncode == 0:
+            return True
+        return all(self._probe_duration(str(f)) for f in output_files)
+        
+    def _probe_duration(self, path: str) -> Optional[float]:
+        """Return a media file's duration in seconds via ffprobe, or None."""
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            path
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            return float(result.stdout.strip()) if result.returncode == 0 else None
+        except (subprocess.TimeoutExpired, FileNotFoundError, ValueError):
+            return None
+        
     def run_full_pipeline(self) -> Dict:
         """
         Execute the complete StudySlice AI pipeline.
@@ -522,6 +1216,10 @@ class StudySliceAI:
         print("🚀 STUDYSLICE AI - FULL PIPELINE")
         print("=" * 50)
         
+        # Per-run analysis counters
+        self.model_calls = 0
+        self.section_summaries = []
+        
         try:
             # Step 1: Load and normalize transcript
             segments = self.load_and_normalize_transcript()
@@ -530,7 +1228,10 @@ class StudySliceAI:
             chunks = self.create_analysis_chunks(segments)
             
             # Step 3: AI analysis for educational concepts
-            concepts = self.analyze_educational_content(chunks)
+            if self.analysis_mode == 'hierarchical':
+                concepts = self.analyze_educational_content_hierarchical(segments, chunks)
+            else:
+                concepts = self.analyze_educational_content(chunks)
             
             # Step 4: Select best clips
             selected_clips = self.select_best_clips(concepts)
@@ -550,11 +1251,26 @@ class StudySliceAI:
             # Step 7: Extract video clips
             extraction_results = self.extract_video_clips(video_path, clips_json_path)
             
+            # Step 8: Re-index with the rendition and preview paths written during extraction
+            self.update_clip_catalog(clips_json_path)
+            
+            if self.search_index_dir:
+                try:
+                    with open(clips_json_path, 'r', encoding='utf-8') as f:
+                        extracted_clips = json.load(f)['clips']
+                    self.build_search_index(segments, extracted_clips)
+                except Exception as e:
+                    print(f"⚠️ Error building search index: {e}")
+            
             # Final results
             pipeline_results = {
                 'transcript_segments': len(segments),
                 'analysis_chunks': len(chunks),
                 'concepts_found': len(concepts),
+                'analysis_mode': self.analysis_mode,
+                'model_calls': self.model_calls,
+                'flat_model_calls': len(chunks),
+                'section_summaries': self.section_summaries,
                 'clips_selected': len(selected_clips),
                 'clips_json': clips_json_path,
                 'video_path': video_path,
@@ -565,6 +1281,7 @@ class StudySliceAI:
             print(f"\n🎉 PIPELINE COMPLETE!")
             print(f"   📊 Processed {len(segments)} transcript segments")
             print(f"   🧠 Found {len(concepts)} educational concepts")
+            print(f"   🤖 Model calls: {self.model_calls} ({self.analysis_mode} mode, flat would use {len(chunks)})")
             print(f"   🎯 Selected {len(selected_clips)} study clips")
             print(f"   ✅ Extracted {extraction_results['successful']} video clips")
             print(f"   📚 Subject: {subject}")
@@ -592,10 +1309,22 @@ Examples:
   
   # Custom output directory and quality
   python studyslice_ai.py --transcript transcript.json --youtube "URL" --output my_clips --quality medium
+  
+  # Encode a high/medium/low rendition ladder from one decode per clip
+  python studyslice_ai.py --transcript transcript.json --video video.mp4 --renditions high,medium,low
+  
+  # Index existing clips JSON files into the catalog
+  python studyslice_ai.py --index-json studyslice_*.json
+  
+  # Query the clip catalog
+  python studyslice_ai.py --query-catalog --subject Biology --concept-type Definition --min-confidence 0.8
+  
+  # Search where a concept is taught
+  python studyslice_ai.py --search "binary search tree"
         """
     )
     
-    parser.add_argument('--transcript', required=True,
+    parser.add_argument('--transcript',
                        help='Path to transcript JSON file')
     parser.add_argument('--youtube', 
                        help='YouTube URL for video download')
@@ -605,9 +1334,79 @@ Examples:
                        help='Output directory for clips (default: study_clips)')
     parser.add_argument('--quality', choices=['high', 'medium', 'low'], default='high',
                        help='Video quality (default: high)')
+    parser.add_argument('--renditions',
+                       help='Comma-separated rendition ladder encoded from one decode per clip, '
+                            'e.g. high,medium,low (overrides --quality)')
+    parser.add_argument('--analysis-mode', choices=['flat', 'hierarchical'], default='flat',
+                       help='Concept analysis mode: every window (flat) or coarse-to-fine '
+                            'for long lectures (hierarchical) (default: flat)')
+    parser.add_argument('--windowing', choices=['adaptive', 'fixed'], default='adaptive',
+                       help='Analysis windowing: pause-aware token-targeted chunks (adaptive) '
+                            'or fixed 120s windows every 30s (fixed) (default: adaptive)')
+    parser.add_argument('--no-previews', action='store_true',
+                       help='Skip thumbnail and preview sprite generation')
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH,
+                       help=f'SQLite clip catalog path (default: {DEFAULT_CATALOG_PATH})')
+    parser.add_argument('--no-catalog', action='store_true',
+                       help='Do not index generated clips in the catalog')
+    parser.add_argument('--index-json', nargs='+', metavar='CLIPS_JSON',
+                       help='Index existing clips JSON files into the catalog and exit')
+    parser.add_argument('--query-catalog', action='store_true',
+                       help='Query the clip catalog and exit')
+    parser.add_argument('--subject',
+                       help='Catalog query: academic subject (e.g. Biology)')
+    parser.add_argument('--concept-type',
+                       help='Catalog query: concept type (e.g. Definition)')
+    parser.add_argument('--min-confidence', type=float,
+                       help='Catalog query: minimum confidence (0-1)')
+    parser.add_argument('--lecture',
+                       help='Catalog query: lecture id')
+    parser.add_argument('--limit', type=int, default=100,
+                       help='Catalog query: maximum clips returned (default: 100)')
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR,
+                       help=f'Concept search index directory (default: {DEFAULT_INDEX_DIR})')
+    parser.add_argument('--no-search-index', action='store_true',
+                       help='Do not build the concept search index')
+    parser.add_argument('--search', metavar='QUERY',
+                       help='Search transcripts and clips for a concept and exit')
     
     args = parser.parse_args()
     
+    # Catalog-only modes
+    if args.index_json:
+        catalog = ClipCatalog(args.catalog)
+        for clips_json_path in args.index_json:
+            indexed = catalog.import_clips_json(clips_json_path)
+            print(f"🗂️ Indexed {indexed} clips from {clips_json_path}")
+        return 0
+        
+    if args.query_catalog:
+        catalog = ClipCatalog(args.catalog)
+        results = catalog.query(
+            subject=args.subject,
+            concept_type=args.concept_type,
+            min_confidence=args.min_confidence,
+            lecture_id=args.lecture,
+            limit=args.limit
+        )
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return 0
+    
+    if args.search:
+        results = ConceptSearch(args.index_dir).search(args.search, limit=args.limit, lecture_id=args.lecture)
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return 0
+    
+    if not args.transcript:
+        parser.error("--transcript is required")
+        
+    renditions = None
+    if args.renditions:
+        renditions = [name.strip() for name in args.renditions.split(',') if name.strip()]
+        invalid = [name for name in renditions if name not in ('high', 'medium', 'low')]
+        if invalid or not renditions or len(set(renditions)) != len(renditions):
+            parser.error("--renditions must be distinct values from: high, medium, low")
+        
     # Validate arguments
     if not args.youtube and not args.video:
         parser.error("Either --youtube or --video must be provided")
@@ -630,7 +1429,13 @@ Examples:
             youtube_url=args.youtube,
             video_path=args.video,
             output_dir=args.output,
-            quality=args.quality
+            quality=args.quality,
+            renditions=renditions,
+            previews=not args.no_previews,
+            analysis_mode=args.analysis_mode,
+            windowing=args.windowing,
+            catalog_path=None if args.no_catalog else args.catalog,
+            search_index_dir=None if args.no_search_index else args.index_dir
         )
         
         # Run pipeline